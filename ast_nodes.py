@@ -1,36 +1,77 @@
 """
 抽象语法树(AST)节点定义
 定义了中文智能合约编译器的所有AST节点类型
+
+子节点列表字段（如 Contract.functions、Block.statements）在构造时未传入时
+默认为共享的空元组，而不是新的空列表。需要追加子节点时必须先调用
+node.ensure_list(字段名) 取得可修改的列表，例如::
+
+    block = Block()
+    block.ensure_list("statements").append(statement)
+
+判断列表字段是否为空应使用 ``not node.statements``，不要与 ``[]`` 比较，
+也不要依赖其类型为 list。
 """
 
-from typing import List, Optional, Any
+from typing import List, Optional, Any, Final
 from enum import Enum
 
 
-class NodeType(Enum):
-    """AST节点类型枚举"""
-    PROGRAM = "program"
-    CONTRACT = "contract"
-    FUNCTION = "function"
-    CONSTRUCTOR = "constructor"
-    STATE_VARIABLE = "state_variable"
-    EVENT = "event"
-    PARAMETER = "parameter"
-    BLOCK = "block"
-    RETURN_STATEMENT = "return_statement"
-    IF_STATEMENT = "if_statement"
-    FOR_STATEMENT = "for_statement"
-    WHILE_STATEMENT = "while_statement"
-    EXPRESSION_STATEMENT = "expression_statement"
-    VARIABLE_DECLARATION = "variable_declaration"
-    ASSIGNMENT = "assignment"
-    BINARY_EXPRESSION = "binary_expression"
-    UNARY_EXPRESSION = "unary_expression"
-    CALL_EXPRESSION = "call_expression"
-    MEMBER_EXPRESSION = "member_expression"
-    INDEX_EXPRESSION = "index_expression"
-    IDENTIFIER = "identifier"
-    LITERAL = "literal"
+# AST节点类型标签（类属性，按整数比较）
+PROGRAM: Final[int] = 0
+CONTRACT: Final[int] = 1
+FUNCTION: Final[int] = 2
+CONSTRUCTOR: Final[int] = 3
+STATE_VARIABLE: Final[int] = 4
+EVENT: Final[int] = 5
+PARAMETER: Final[int] = 6
+BLOCK: Final[int] = 7
+RETURN_STATEMENT: Final[int] = 8
+IF_STATEMENT: Final[int] = 9
+FOR_STATEMENT: Final[int] = 10
+WHILE_STATEMENT: Final[int] = 11
+EXPRESSION_STATEMENT: Final[int] = 12
+VARIABLE_DECLARATION: Final[int] = 13
+ASSIGNMENT: Final[int] = 14
+BINARY_EXPRESSION: Final[int] = 15
+UNARY_EXPRESSION: Final[int] = 16
+CALL_EXPRESSION: Final[int] = 17
+MEMBER_EXPRESSION: Final[int] = 18
+INDEX_EXPRESSION: Final[int] = 19
+IDENTIFIER: Final[int] = 20
+LITERAL: Final[int] = 21
+
+# 节点类型标签对应的名称，按标签索引，仅用于调试输出
+_NODE_TYPE_NAMES = (
+    "program",
+    "contract",
+    "function",
+    "constructor",
+    "state_variable",
+    "event",
+    "parameter",
+    "block",
+    "return_statement",
+    "if_statement",
+    "for_statement",
+    "while_statement",
+    "expression_statement",
+    "variable_declaration",
+    "assignment",
+    "binary_expression",
+    "unary_expression",
+    "call_expression",
+    "member_expression",
+    "index_expression",
+    "identifier",
+    "literal",
+)
+assert len(_NODE_TYPE_NAMES) == LITERAL + 1, "_NODE_TYPE_NAMES 与节点类型标签数量不一致"
+
+
+def node_type_name(node_type: int) -> str:
+    """获取节点类型标签的名称（调试用）"""
+    return _NODE_TYPE_NAMES[node_type]
 
 
 class Visibility(Enum):
@@ -49,84 +90,202 @@ class Mutability(Enum):
     NONE = "none"
 
 
-class ASTNode:
+class FieldKind(Enum):
+    """AST节点字段类别"""
+    SCALAR = "scalar"        # 普通值（名称、类型名、修饰符等）
+    NODE_OPT = "node_opt"    # 可选的单个子节点
+    NODE_LIST = "node_list"  # 子节点列表
+
+
+SCALAR = FieldKind.SCALAR
+NODE_OPT = FieldKind.NODE_OPT
+NODE_LIST = FieldKind.NODE_LIST
+
+# 子节点列表字段的共享默认值，需要追加时通过 ASTNode.ensure_list 换成新列表，
+# 避免为每个空的函数体、参数列表等各分配一个空列表
+_EMPTY = ()
+
+
+def _make_init(cls, fields):
+    """根据字段声明生成 __init__，默认值处理在类创建时一次性展开"""
+    namespace = {"_EMPTY": _EMPTY}
+    params = []
+    body = []
+    for i, (name, kind, *default) in enumerate(fields):
+        if kind is SCALAR:
+            default_name = f"_default_{i}"
+            namespace[default_name] = default[0] if default else None
+            params.append(f"{name}={default_name}")
+            body.append(f"    self.{name} = {name}")
+        elif kind is NODE_LIST:
+            params.append(f"{name}=None")
+            body.append(f"    self.{name} = {name} if {name} is not None else _EMPTY")
+        else:
+            params.append(f"{name}=None")
+            body.append(f"    self.{name} = {name}")
+    params += ["line=0", "column=0"]
+    body += ["    self.line = line", "    self.column = column"]
+    source = f"def __init__(self, {', '.join(params)}):\n" + "\n".join(body)
+    exec(source, namespace)
+    init = namespace["__init__"]
+    init.__qualname__ = f"{cls.__qualname__}.__init__"
+    return init
+
+
+def _make_iter_child_nodes(cls):
+    """根据 _child_fields 生成按声明顺序产出子节点的 iter_child_nodes"""
+    body = []
+    for name, is_list in cls._child_fields:
+        if is_list:
+            body.append(f"    yield from self.{name}")
+        else:
+            body.append(f"    if self.{name} is not None:")
+            body.append(f"        yield self.{name}")
+    if not body:
+        body.append("    yield from ()")
+    namespace = {}
+    exec("def iter_child_nodes(self):\n" + "\n".join(body), namespace)
+    method = namespace["iter_child_nodes"]
+    method.__qualname__ = f"{cls.__qualname__}.iter_child_nodes"
+    return method
+
+
+class ASTMeta(type):
+    """
+    AST节点元类
+
+    在类创建时读取 ``_fields`` 声明，预先区分标量字段、子节点字段和子节点列表字段，
+    并据此生成 ``__slots__``、``__init__`` 与 ``iter_child_nodes``，避免每次构造和
+    遍历时重复判断，同时去掉每个节点实例的 ``__dict__``。访问者分派用的方法名
+    ``_visit_method`` 也在此预先计算。
+    """
+    def __new__(mcs, name, bases, namespace):
+        fields = namespace.get("_fields")
+        if "__slots__" not in namespace:
+            namespace["__slots__"] = tuple(f[0] for f in fields) if fields else ()
+        cls = super().__new__(mcs, name, bases, namespace)
+        cls._visit_method = f"visit_{name}"
+        if fields is not None:
+            # 子节点字段按声明顺序记为 (字段名, 是否为列表)，遍历相关的代码都由它生成
+            cls._child_fields = tuple(
+                (f[0], f[1] is NODE_LIST) for f in fields if f[1] is not SCALAR
+            )
+            # 逆序副本供 iter_descendants 直接压栈
+            cls._reversed_child_fields = cls._child_fields[::-1]
+            cls.__init__ = _make_init(cls, fields)
+            cls.iter_child_nodes = _make_iter_child_nodes(cls)
+        return cls
+
+
+class ASTNode(metaclass=ASTMeta):
     """AST节点基类"""
-    def __init__(self, node_type: NodeType, line: int = 0, column: int = 0):
-        self.node_type = node_type
+    __slots__ = ("line", "column")
+    _child_fields = ()
+    _reversed_child_fields = ()
+
+    def __init__(self, line: int = 0, column: int = 0):
         self.line = line
         self.column = column
 
+    def iter_child_nodes(self):
+        """按字段声明顺序迭代直接子节点"""
+        yield from ()
+
+    def __repr__(self):
+        fields = []
+        for name, *_ in getattr(self, "_fields", ()):
+            value = getattr(self, name)
+            # 共享的空默认值按空列表显示，与传入列表的字段一致
+            fields.append(f"{name}={[] if value is _EMPTY else value!r}")
+        return f"{type(self).__name__}({', '.join(fields)})"
+
+    def ensure_list(self, name: str) -> list:
+        """
+        获取可追加的子节点列表
+
+        子节点列表字段未传入时默认为共享的空元组，不能直接 append；
+        调用本方法会在首次使用时换成新列表并返回，之后返回同一个列表。
+        """
+        value = getattr(self, name)
+        if value is _EMPTY:
+            value = []
+            setattr(self, name, value)
+        return value
+
 
 class Program(ASTNode):
     """程序根节点"""
-    def __init__(self, contracts=None, line=0, column=0):
-        super().__init__(NodeType.PROGRAM, line, column)
-        self.contracts = contracts if contracts is not None else []
+    node_type = PROGRAM
+    _fields = (("contracts", NODE_LIST),)
 
 
 class Contract(ASTNode):
     """合约节点"""
-    def __init__(self, name="", state_variables=None, functions=None, events=None, constructor=None, line=0, column=0):
-        super().__init__(NodeType.CONTRACT, line, column)
-        self.name = name
-        self.state_variables = state_variables if state_variables is not None else []
-        self.functions = functions if functions is not None else []
-        self.events = events if events is not None else []
-        self.constructor = constructor
+    node_type = CONTRACT
+    _fields = (
+        ("name", SCALAR, ""),
+        ("state_variables", NODE_LIST),
+        ("functions", NODE_LIST),
+        ("events", NODE_LIST),
+        ("constructor", NODE_OPT),
+    )
 
 
 class StateVariable(ASTNode):
     """状态变量节点"""
-    def __init__(self, name="", var_type="", visibility=Visibility.PRIVATE, initial_value=None, line=0, column=0):
-        super().__init__(NodeType.STATE_VARIABLE, line, column)
-        self.name = name
-        self.var_type = var_type
-        self.visibility = visibility
-        self.initial_value = initial_value
+    node_type = STATE_VARIABLE
+    _fields = (
+        ("name", SCALAR, ""),
+        ("var_type", SCALAR, ""),
+        ("visibility", SCALAR, Visibility.PRIVATE),
+        ("initial_value", NODE_OPT),
+    )
 
 
 class Function(ASTNode):
     """函数节点"""
-    def __init__(self, name="", parameters=None, return_type=None, visibility=Visibility.PUBLIC, 
-                 mutability=Mutability.NONE, body=None, line=0, column=0):
-        super().__init__(NodeType.FUNCTION, line, column)
-        self.name = name
-        self.parameters = parameters if parameters is not None else []
-        self.return_type = return_type
-        self.visibility = visibility
-        self.mutability = mutability
-        self.body = body
+    node_type = FUNCTION
+    _fields = (
+        ("name", SCALAR, ""),
+        ("parameters", NODE_LIST),
+        ("return_type", SCALAR, None),
+        ("visibility", SCALAR, Visibility.PUBLIC),
+        ("mutability", SCALAR, Mutability.NONE),
+        ("body", NODE_OPT),
+    )
 
 
 class Constructor(ASTNode):
     """构造函数节点"""
-    def __init__(self, parameters=None, body=None, line=0, column=0):
-        super().__init__(NodeType.CONSTRUCTOR, line, column)
-        self.parameters = parameters if parameters is not None else []
-        self.body = body
+    node_type = CONSTRUCTOR
+    _fields = (
+        ("parameters", NODE_LIST),
+        ("body", NODE_OPT),
+    )
 
 
 class Event(ASTNode):
     """事件节点"""
-    def __init__(self, name="", parameters=None, line=0, column=0):
-        super().__init__(NodeType.EVENT, line, column)
-        self.name = name
-        self.parameters = parameters if parameters is not None else []
+    node_type = EVENT
+    _fields = (
+        ("name", SCALAR, ""),
+        ("parameters", NODE_LIST),
+    )
 
 
 class Parameter(ASTNode):
     """参数节点"""
-    def __init__(self, name="", param_type="", line=0, column=0):
-        super().__init__(NodeType.PARAMETER, line, column)
-        self.name = name
-        self.param_type = param_type
+    node_type = PARAMETER
+    _fields = (
+        ("name", SCALAR, ""),
+        ("param_type", SCALAR, ""),
+    )
 
 
 class Block(ASTNode):
     """代码块节点"""
-    def __init__(self, statements=None, line=0, column=0):
-        super().__init__(NodeType.BLOCK, line, column)
-        self.statements = statements if statements is not None else []
+    node_type = BLOCK
+    _fields = (("statements", NODE_LIST),)
 
 
 class Statement(ASTNode):
@@ -136,52 +295,54 @@ class Statement(ASTNode):
 
 class ReturnStatement(Statement):
     """返回语句节点"""
-    def __init__(self, value=None, line=0, column=0):
-        super().__init__(NodeType.RETURN_STATEMENT, line, column)
-        self.value = value
+    node_type = RETURN_STATEMENT
+    _fields = (("value", NODE_OPT),)
 
 
 class IfStatement(Statement):
     """条件语句节点"""
-    def __init__(self, condition=None, then_block=None, else_block=None, line=0, column=0):
-        super().__init__(NodeType.IF_STATEMENT, line, column)
-        self.condition = condition
-        self.then_block = then_block
-        self.else_block = else_block
+    node_type = IF_STATEMENT
+    _fields = (
+        ("condition", NODE_OPT),
+        ("then_block", NODE_OPT),
+        ("else_block", NODE_OPT),
+    )
 
 
 class ForStatement(Statement):
     """循环语句节点"""
-    def __init__(self, init=None, condition=None, update=None, body=None, line=0, column=0):
-        super().__init__(NodeType.FOR_STATEMENT, line, column)
-        self.init = init
-        self.condition = condition
-        self.update = update
-        self.body = body
+    node_type = FOR_STATEMENT
+    _fields = (
+        ("init", NODE_OPT),
+        ("condition", NODE_OPT),
+        ("update", NODE_OPT),
+        ("body", NODE_OPT),
+    )
 
 
 class WhileStatement(Statement):
     """while循环语句节点"""
-    def __init__(self, condition=None, body=None, line=0, column=0):
-        super().__init__(NodeType.WHILE_STATEMENT, line, column)
-        self.condition = condition
-        self.body = body
+    node_type = WHILE_STATEMENT
+    _fields = (
+        ("condition", NODE_OPT),
+        ("body", NODE_OPT),
+    )
 
 
 class ExpressionStatement(Statement):
     """表达式语句节点"""
-    def __init__(self, expression=None, line=0, column=0):
-        super().__init__(NodeType.EXPRESSION_STATEMENT, line, column)
-        self.expression = expression
+    node_type = EXPRESSION_STATEMENT
+    _fields = (("expression", NODE_OPT),)
 
 
 class VariableDeclaration(Statement):
     """变量声明节点"""
-    def __init__(self, name="", var_type="", initial_value=None, line=0, column=0):
-        super().__init__(NodeType.VARIABLE_DECLARATION, line, column)
-        self.name = name
-        self.var_type = var_type
-        self.initial_value = initial_value
+    node_type = VARIABLE_DECLARATION
+    _fields = (
+        ("name", SCALAR, ""),
+        ("var_type", SCALAR, ""),
+        ("initial_value", NODE_OPT),
+    )
 
 
 class Expression(ASTNode):
@@ -191,66 +352,110 @@ class Expression(ASTNode):
 
 class Assignment(Expression):
     """赋值表达式节点"""
-    def __init__(self, left=None, operator="=", right=None, line=0, column=0):
-        super().__init__(NodeType.ASSIGNMENT, line, column)
-        self.left = left
-        self.operator = operator
-        self.right = right
+    node_type = ASSIGNMENT
+    _fields = (
+        ("left", NODE_OPT),
+        ("operator", SCALAR, "="),
+        ("right", NODE_OPT),
+    )
 
 
 class BinaryExpression(Expression):
     """二元表达式节点"""
-    def __init__(self, left=None, operator="", right=None, line=0, column=0):
-        super().__init__(NodeType.BINARY_EXPRESSION, line, column)
-        self.left = left
-        self.operator = operator
-        self.right = right
+    node_type = BINARY_EXPRESSION
+    _fields = (
+        ("left", NODE_OPT),
+        ("operator", SCALAR, ""),
+        ("right", NODE_OPT),
+    )
 
 
 class UnaryExpression(Expression):
     """一元表达式节点"""
-    def __init__(self, operator="", operand=None, prefix=True, line=0, column=0):
-        super().__init__(NodeType.UNARY_EXPRESSION, line, column)
-        self.operator = operator
-        self.operand = operand
-        self.prefix = prefix
+    node_type = UNARY_EXPRESSION
+    _fields = (
+        ("operator", SCALAR, ""),
+        ("operand", NODE_OPT),
+        ("prefix", SCALAR, True),
+    )
 
 
 class CallExpression(Expression):
     """函数调用表达式节点"""
-    def __init__(self, callee=None, arguments=None, line=0, column=0):
-        super().__init__(NodeType.CALL_EXPRESSION, line, column)
-        self.callee = callee
-        self.arguments = arguments if arguments is not None else []
+    node_type = CALL_EXPRESSION
+    _fields = (
+        ("callee", NODE_OPT),
+        ("arguments", NODE_LIST),
+    )
 
 
 class MemberExpression(Expression):
     """成员访问表达式节点"""
-    def __init__(self, object=None, property="", line=0, column=0):
-        super().__init__(NodeType.MEMBER_EXPRESSION, line, column)
-        self.object = object
-        self.property = property
+    node_type = MEMBER_EXPRESSION
+    _fields = (
+        ("object", NODE_OPT),
+        ("property", SCALAR, ""),
+    )
 
 
 class IndexExpression(Expression):
     """索引访问表达式节点"""
-    def __init__(self, object=None, index=None, line=0, column=0):
-        super().__init__(NodeType.INDEX_EXPRESSION, line, column)
-        self.object = object
-        self.index = index
+    node_type = INDEX_EXPRESSION
+    _fields = (
+        ("object", NODE_OPT),
+        ("index", NODE_OPT),
+    )
 
 
 class Identifier(Expression):
     """标识符节点"""
-    def __init__(self, name="", line=0, column=0):
-        super().__init__(NodeType.IDENTIFIER, line, column)
-        self.name = name
+    node_type = IDENTIFIER
+    _fields = (("name", SCALAR, ""),)
 
 
 class Literal(Expression):
     """字面量节点"""
-    def __init__(self, value=None, literal_type="", line=0, column=0):
-        super().__init__(NodeType.LITERAL, line, column)
-        self.value = value
-        self.literal_type = literal_type
-
+    node_type = LITERAL
+    _fields = (
+        ("value", SCALAR, None),
+        ("literal_type", SCALAR, ""),
+    )
+
+
+def iter_descendants(root: ASTNode):
+    """
+    先序深度优先遍历 root 及其全部后代节点
+
+    使用显式栈代替递归，深层AST不会产生逐层的生成器嵌套和函数调用；
+    子节点直接按类创建时预先分类的字段压栈，不为每个节点创建临时列表
+    """
+    stack = [root]
+    pop = stack.pop
+    push = stack.append
+    extend = stack.extend
+    while stack:
+        node = pop()
+        yield node
+        for name, is_list in node._reversed_child_fields:
+            child = getattr(node, name)
+            if is_list:
+                extend(reversed(child))
+            elif child is not None:
+                push(child)
+
+
+class NodeVisitor:
+    """
+    AST访问者基类
+
+    按节点类名分派到 ``visit_<类名>`` 方法（如 ``visit_BinaryExpression``），
+    未定义对应方法时调用 ``generic_visit``。分派只需一次属性查找，不需要 isinstance 链。
+    """
+    def visit(self, node):
+        """访问节点"""
+        return getattr(self, node._visit_method, self.generic_visit)(node)
+
+    def generic_visit(self, node):
+        """依次访问所有子节点"""
+        for child in node.iter_child_nodes():
+            self.visit(child)
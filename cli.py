@@ -3,17 +3,40 @@
 中文智能合约编译器命令行工具
 """
 
+import contextlib
+import functools
+import glob
+import itertools
 import os
 import sys
 import click
-from rich.console import Console
-from rich.syntax import Syntax
-from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn
 
-from compiler import ChineseSolidityCompiler, CompilerError
+# rich 和编译器模块在各命令内部按需导入，避免拖慢 --help、version 等命令的启动
 
-console = Console()
+
+@functools.cache
+def _console():
+    """获取全局 rich 控制台（首次使用时创建）"""
+    from rich.console import Console
+    return Console()
+
+
+@contextlib.contextmanager
+def _progress(description: str):
+    """显示进度动画，输出不是终端时（CI、管道）直接跳过，不创建刷新线程"""
+    if not sys.stdout.isatty():
+        yield
+        return
+    
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        console=_console(),
+        transient=True
+    ) as progress:
+        progress.add_task(description, total=None)
+        yield
 
 
 @click.group()
@@ -38,35 +61,35 @@ def compile(input_file, output_file, verbose, show_tokens, show_ast):
     示例:
         zhsc compile my_contract.zhs -o my_contract.sol
     """
+    from rich.syntax import Syntax
+    from rich.panel import Panel
+    from compiler import ChineseSolidityCompiler, CompilerError
+    
+    console = _console()
     try:
         # 如果没有指定输出文件，自动生成
         if not output_file:
             base_name = os.path.splitext(input_file)[0]
             output_file = base_name + '.sol'
         
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            console=console,
-            transient=True
-        ) as progress:
-            task = progress.add_task("正在编译...", total=None)
-            
+        with _progress("正在编译..."):
             # 创建编译器
-            compiler = ChineseSolidityCompiler(verbose=verbose)
+            compiler = ChineseSolidityCompiler(
+                verbose=verbose,
+                keep_intermediates=show_tokens or show_ast
+            )
             
             # 编译文件
             solidity_code = compiler.compile_file(input_file, output_file)
-            
-            progress.update(task, completed=True)
         
         # 显示Token列表
         if show_tokens:
             console.print("\n[bold cyan]Token列表:[/bold cyan]")
-            for i, token in enumerate(compiler.get_tokens()[:20]):  # 只显示前20个
-                console.print(f"  {i+1}. {token}")
-            if len(compiler.get_tokens()) > 20:
-                console.print(f"  ... 还有 {len(compiler.get_tokens()) - 20} 个Token")
+            tokens = compiler.get_tokens()
+            for i, token in enumerate(itertools.islice(tokens, 20), 1):  # 只显示前20个
+                console.print(f"  {i}. {token}")
+            if len(tokens) > 20:
+                console.print(f"  ... 还有 {len(tokens) - 20} 个Token")
         
         # 显示AST
         if show_ast:
@@ -99,17 +122,13 @@ def check(input_file):
     示例:
         zhsc check my_contract.zhs
     """
+    from compiler import ChineseSolidityCompiler, CompilerError
+    
+    console = _console()
     try:
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            console=console,
-            transient=True
-        ) as progress:
-            task = progress.add_task("正在检查语法...", total=None)
-            
+        with _progress("正在检查语法..."):
             # 创建编译器
-            compiler = ChineseSolidityCompiler(verbose=False)
+            compiler = ChineseSolidityCompiler(verbose=False, keep_intermediates=False)
             
             # 读取源代码
             with open(input_file, 'r', encoding='utf-8') as f:
@@ -117,8 +136,6 @@ def check(input_file):
             
             # 编译（不输出文件）
             compiler.compile(source_code)
-            
-            progress.update(task, completed=True)
         
         console.print(f"\n[bold green]✓ 语法检查通过![/bold green]")
         console.print(f"文件: {input_file}")
@@ -131,18 +148,144 @@ def check(input_file):
         sys.exit(1)
 
 
+# compile-all 工作进程内复用的编译器实例
+_worker_compiler = None
+
+
+def _init_worker():
+    """compile-all 工作进程初始化：导入编译器并创建复用的实例"""
+    global _worker_compiler
+    from compiler import ChineseSolidityCompiler
+    _worker_compiler = ChineseSolidityCompiler(verbose=False, keep_intermediates=False)
+
+
+def _compile_worker(input_file):
+    """在工作进程中编译单个文件，返回 (输入文件, 错误信息)"""
+    output_file = os.path.splitext(input_file)[0] + '.sol'
+    try:
+        _worker_compiler.compile_file(input_file, output_file)
+    except Exception as e:
+        return input_file, str(e)
+    return input_file, None
+
+
+@cli.command('compile-all')
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('-j', '--jobs', type=click.IntRange(min=1), default=os.cpu_count(),
+              show_default=True, help='并行编译的进程数')
+def compile_all(directory, jobs):
+    """批量编译目录下的所有中文智能合约文件
+    
+    递归查找目录中的 .zhs 文件，在多个进程中并行编译，
+    每个文件输出到同名的 .sol 文件。
+    
+    示例:
+        zhsc compile-all contracts/ -j 8
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    
+    console = _console()
+    input_files = sorted(glob.glob(os.path.join(directory, '**', '*.zhs'), recursive=True))
+    if not input_files:
+        console.print(f"[yellow]未找到 .zhs 文件:[/yellow] {directory}")
+        return
+    
+    failed = 0
+    with _progress(f"正在编译 {len(input_files)} 个文件..."):
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as executor:
+            for input_file, error in executor.map(_compile_worker, input_files):
+                if error is None:
+                    console.print(f"[green]✓[/green] {input_file}")
+                else:
+                    failed += 1
+                    console.print(f"[red]✗[/red] {input_file}: {error}")
+    
+    if failed:
+        console.print(f"\n[bold red]✗ {failed}/{len(input_files)} 个文件编译失败[/bold red]")
+        sys.exit(1)
+    console.print(f"\n[bold green]✓ 全部编译成功![/bold green] 共 {len(input_files)} 个文件")
+
+
+@cli.command()
+@click.option('--socket', 'socket_path', type=click.Path(), help='套接字路径（默认 ~/.cache/zhsc/zhsc.sock）')
+def daemon(socket_path):
+    """启动编译守护进程
+    
+    常驻内存复用已加载的编译器，通过 Unix 套接字为编辑器插件等工具提供快速编译。
+    
+    示例:
+        zhsc daemon
+    """
+    import signal
+    import daemon as zhsc_daemon
+    
+    if not zhsc_daemon.HAS_UNIX_SOCKETS:
+        _console().print("[bold red]✗ 错误:[/bold red] 当前平台不支持 Unix 套接字，无法启动守护进程", style="red")
+        sys.exit(1)
+    
+    # 收到 SIGTERM 时正常退出，以便关闭服务并删除套接字文件
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server = zhsc_daemon.CompileServer(socket_path)
+    except (RuntimeError, OSError) as e:
+        _console().print(f"[bold red]✗ 错误:[/bold red] {e}", style="red")
+        sys.exit(1)
+    with server:
+        _console().print(f"[bold green]✓ 编译守护进程已启动:[/bold green] {server.server_address}")
+        server.serve_forever()
+
+
+@cli.command()
+@click.argument('input_file', type=click.Path(exists=True))
+@click.option('-o', '--output', 'output_file', type=click.Path(), help='输出文件路径，默认输出到标准输出')
+@click.option('--socket', 'socket_path', type=click.Path(), help='套接字路径（默认 ~/.cache/zhsc/zhsc.sock）')
+def client(input_file, output_file, socket_path):
+    """通过编译守护进程编译文件
+    
+    守护进程未运行时在当前进程内编译。
+    
+    示例:
+        zhsc client my_contract.zhs -o my_contract.sol
+    """
+    from daemon import request_compile
+    
+    try:
+        with open(input_file, 'r', encoding='utf-8') as f:
+            source_code = f.read()
+        
+        try:
+            solidity_code = request_compile(source_code, socket_path)
+        except OSError:
+            # 守护进程未运行，回退到进程内编译
+            from compiler import compile_code
+            solidity_code = compile_code(source_code)
+        
+        if output_file:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                f.write(solidity_code)
+        else:
+            click.echo(solidity_code, nl=False)
+    except Exception as e:
+        click.echo(f"✗ 编译失败: {e}", err=True)
+        sys.exit(1)
+
+
 @cli.command()
 def version():
     """显示版本信息"""
-    console.print("[bold cyan]中文智能合约编译器[/bold cyan]")
-    console.print("版本: 0.1.0")
-    console.print("作者: Your Name")
-    console.print("许可证: MIT")
+    print("中文智能合约编译器")
+    print("版本: 0.1.0")
+    print("作者: Your Name")
+    print("许可证: MIT")
 
 
 @cli.command()
 def examples():
     """显示示例代码"""
+    from rich.syntax import Syntax
+    from rich.panel import Panel
+    
+    console = _console()
     example_code = """合约 我的代币 {
     公开 字符串 名称 = "我的代币";
     公开 字符串 符号 = "MYT";
@@ -182,10 +325,10 @@ def main():
     try:
         cli()
     except KeyboardInterrupt:
-        console.print("\n\n[yellow]操作已取消[/yellow]")
+        _console().print("\n\n[yellow]操作已取消[/yellow]")
         sys.exit(0)
     except Exception as e:
-        console.print(f"\n[bold red]错误:[/bold red] {e}", style="red")
+        _console().print(f"\n[bold red]错误:[/bold red] {e}", style="red")
         sys.exit(1)
 
 
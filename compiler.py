@@ -3,14 +3,79 @@
 整合词法分析、语法分析和代码生成
 """
 
+import functools
+import hashlib
+import mmap
 import os
+import stat
 import sys
+import tempfile
+import threading
+import time
+import warnings
 from typing import Optional
 
 from lexer.chinese_lexer import ChineseLexer, tokenize
 from parser.chinese_parser import ChineseParser, parse
 from codegen.solidity_generator import SolidityGenerator, generate_solidity
 
+# 词法分析后端选择
+#
+# 不要用 Numba 的 @njit 包装 tokenize/parse：Numba 对 str 和对象密集型代码
+# 支持很差，每次调用有分派开销，导入本身还要数百毫秒，对词法/语法分析几乎
+# 没有收益。需要加速时使用C扩展：设置 ZHSC_LEXER_BACKEND=c 时加载编译好的
+# _chinese_lexer 扩展，其 tokenize_bytes(buf: bytes) -> list 直接在 UTF-8 字节
+# 上按首字节分派的手写DFA扫描（中文关键字首字节都在 0xE4-0xE9 范围内）。
+#
+# tokenize_bytes 的返回值必须能直接交给 parse：与 lexer.chinese_lexer.tokenize
+# 返回同类型的Token对象列表，Token的类型、值与Python词法分析器完全一致，
+# 值为 str 而非 bytes，行号、列号按字符而非字节计算。
+#
+# 扩展不可用时发出警告并回退到纯Python词法分析器。
+_LEXER_BACKEND = "python"
+if os.environ.get("ZHSC_LEXER_BACKEND") == "c":
+    try:
+        from _chinese_lexer import tokenize_bytes
+    except ImportError as e:
+        warnings.warn(f"ZHSC_LEXER_BACKEND=c 但无法加载C词法分析扩展 _chinese_lexer（{e}），"
+                      f"使用Python词法分析器", RuntimeWarning)
+    else:
+        _LEXER_BACKEND = "c"
+        
+        def tokenize(source_code: str):
+            """使用C扩展进行词法分析"""
+            return tokenize_bytes(source_code.encode("utf-8"))
+
+# 可选的原生编译后端（zhsc_core，Rust/PyO3 实现，词法、语法分析和代码生成一次完成）。
+# 需设置 ZHSC_BACKEND=native 显式启用；未安装时发出警告并使用Python流水线。
+# 原生后端不产生Token列表和AST，需要中间结果的编译仍使用Python流水线。
+zhsc_core = None
+if os.environ.get("ZHSC_BACKEND") == "native":
+    try:
+        import zhsc_core
+    except ImportError as e:
+        warnings.warn(f"ZHSC_BACKEND=native 但无法加载原生后端 zhsc_core（{e}），"
+                      f"使用Python流水线", RuntimeWarning)
+
+__version__ = "0.1.0"
+
+# 超过该大小的源文件通过 mmap 读取
+_MMAP_THRESHOLD = 64 * 1024
+
+# 新建输出文件的权限位，与 open() 直接创建时一致（读取 umask 需要先设置再恢复，只在导入时做一次）
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+_NEW_FILE_MODE = 0o666 & ~_UMASK
+
+# 编译缓存最多保留的条目数，超出时删除最久未使用的条目
+_CACHE_MAX_ENTRIES = 256
+
+# 缓存目录中超过该时长（秒）的临时文件视为被中断的写入遗留，清理缓存时删除
+_CACHE_STALE_TMP_SECONDS = 3600
+
+# 生成代码取决于这些包（顶层包名）中已加载模块的源文件，它们参与缓存键的计算
+_FINGERPRINT_PACKAGES = ("lexer", "parser", "codegen", "ast_nodes", "_chinese_lexer", "zhsc_core")
+
 
 class CompilerError(Exception):
     """编译器错误基类"""
@@ -32,17 +97,149 @@ class CodeGenError(CompilerError):
     pass
 
 
+def _write_bytes_atomic(path: str, data: bytes):
+    """
+    一次性写入文件：先写入临时文件再替换目标文件，
+    并行编译时其他进程不会读到写了一半的输出
+    
+    与直接覆盖写入保持一致：目标是符号链接时写入其指向的文件，
+    已存在的目标文件保留原有权限位，新文件按 umask 设置权限位。
+    临时文件由 mkstemp 创建，同一进程内多个线程同时写入同一路径也互不干扰。
+    """
+    path = os.path.realpath(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = _NEW_FILE_MODE
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with open(fd, 'wb') as f:
+            f.write(data)
+        # mkstemp 创建的文件权限为 0600
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _read_source(path: str) -> str:
+    """
+    读取UTF-8源文件
+    
+    大文件映射到内存后直接解码，不再先读出一份完整的 bytes 副本；
+    小文件映射的开销大于收益，按文本模式直接读取。
+    """
+    if os.path.getsize(path) < _MMAP_THRESHOLD:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        source_code = str(mm, 'utf-8')
+    # 与文本模式读取保持一致，统一换行符
+    if '\r' in source_code:
+        source_code = source_code.replace('\r\n', '\n').replace('\r', '\n')
+    return source_code
+
+
+def get_cache_dir() -> str:
+    """获取编译缓存目录（遵循 XDG_CACHE_HOME，默认 ~/.cache/zhsc）"""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache_home, "zhsc")
+
+
+@functools.cache
+def _pipeline_fingerprint() -> str:
+    """
+    编译流水线指纹：本模块及已加载的词法/语法/代码生成模块文件的路径、大小和修改时间
+    
+    每个进程只计算一次，与该进程实际加载的代码对应。
+    """
+    paths = [__file__]
+    for name, module in sorted(list(sys.modules.items())):
+        if name.split('.')[0] in _FINGERPRINT_PACKAGES and getattr(module, '__file__', None):
+            paths.append(module.__file__)
+    parts = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            parts.append(f"{path}:{st.st_size}:{st.st_mtime_ns}")
+        except OSError:
+            parts.append(path)
+    return "\n".join(parts)
+
+
+def _backend_name() -> str:
+    """不保留中间结果时实际使用的编译后端"""
+    if zhsc_core is not None:
+        return "native"
+    return f"python/{_LEXER_BACKEND}"
+
+
+def _cache_path(source_code: str) -> str:
+    """根据编译器版本、后端、流水线指纹和源代码内容计算缓存文件路径"""
+    key = f"{__version__}\0{_backend_name()}\0{_pipeline_fingerprint()}\0{source_code}"
+    digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+    return os.path.join(get_cache_dir(), f"{digest}.sol")
+
+
+def _entry_mtime(entry: os.DirEntry) -> int:
+    """缓存条目的修改时间（条目已被其他进程删除时返回0）"""
+    try:
+        return entry.stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
+def _prune_cache(cache_dir: str):
+    """
+    缓存条目超过 _CACHE_MAX_ENTRIES 时删除最久未使用的条目，
+    并删除写入进程被中断后遗留的临时文件
+    """
+    entries = []
+    stale = []
+    stale_before = time.time_ns() - _CACHE_STALE_TMP_SECONDS * 1_000_000_000
+    try:
+        with os.scandir(cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith('.sol'):
+                    entries.append(entry)
+                elif entry.name.endswith('.tmp') and _entry_mtime(entry) < stale_before:
+                    stale.append(entry)
+    except OSError:
+        return
+    for entry in stale:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+    excess = len(entries) - _CACHE_MAX_ENTRIES
+    if excess <= 0:
+        return
+    entries.sort(key=_entry_mtime)
+    for entry in entries[:excess]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
 class ChineseSolidityCompiler:
     """中文Solidity编译器"""
     
-    def __init__(self, verbose: bool = False):
+    def __init__(self, verbose: bool = False, keep_intermediates: bool = True):
         """
         初始化编译器
         
         Args:
             verbose: 是否输出详细信息
+            keep_intermediates: 是否保留Token列表和AST，为False时用完即释放，
+                并允许使用原生后端（ZHSC_BACKEND=native）和编译缓存
         """
         self.verbose = verbose
+        self.keep_intermediates = keep_intermediates
         self.source_code = ""
         self.tokens = []
         self.ast = None
@@ -68,23 +265,52 @@ class ChineseSolidityCompiler:
         
         # 读取源代码
         try:
-            with open(input_file, 'r', encoding='utf-8') as f:
-                self.source_code = f.read()
+            self.source_code = _read_source(input_file)
         except FileNotFoundError:
             raise CompilerError(f"文件不存在: {input_file}")
         except Exception as e:
             raise CompilerError(f"读取文件失败: {e}")
         
-        # 编译
-        solidity_code = self.compile(self.source_code)
+        # 不需要中间结果时，按源代码内容查找编译缓存（设置 ZHSC_NO_CACHE 可禁用）
+        cache_path = None
+        solidity_code = None
+        if not self.keep_intermediates and not os.environ.get("ZHSC_NO_CACHE"):
+            cache_path = _cache_path(self.source_code)
+            try:
+                with open(cache_path, 'rb') as f:
+                    data = f.read()
+                solidity_code = data.decode('utf-8')
+            except (OSError, UnicodeDecodeError):
+                # 缓存条目不存在或已损坏时按未命中处理，重新编译后覆盖
+                pass
+        
+        if solidity_code is not None:
+            self.log(f"命中编译缓存: {cache_path}")
+            try:
+                # 更新修改时间，清理缓存时按最近使用排序
+                os.utime(cache_path)
+            except OSError:
+                pass
+            self.tokens = []
+            self.ast = None
+            self.solidity_code = solidity_code
+        else:
+            # 编译
+            solidity_code = self._compile_source(self.source_code)
+            data = solidity_code.encode('utf-8')
+            if cache_path:
+                try:
+                    _write_bytes_atomic(cache_path, data)
+                    _prune_cache(os.path.dirname(cache_path))
+                except OSError:
+                    # 缓存目录不可写时不影响编译结果
+                    pass
         
         # 写入输出文件
         if output_file:
             self.log(f"写入输出文件: {output_file}")
             try:
-                os.makedirs(os.path.dirname(output_file), exist_ok=True)
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    f.write(solidity_code)
+                _write_bytes_atomic(output_file, data)
             except Exception as e:
                 raise CompilerError(f"写入文件失败: {e}")
         
@@ -101,32 +327,58 @@ class ChineseSolidityCompiler:
             生成的Solidity代码
         """
         self.source_code = source_code
+        return self._compile_source(source_code)
+    
+    def _compile_source(self, source_code: str) -> str:
+        """执行编译流水线（调用方负责设置 self.source_code）"""
+        self.tokens = []
+        self.ast = None
+        
+        if zhsc_core is not None:
+            if not self.keep_intermediates:
+                self.log("使用原生后端 zhsc_core 编译...")
+                try:
+                    solidity_code = zhsc_core.compile_to_solidity(source_code)
+                except Exception as e:
+                    raise CompilerError(f"编译失败: {e}")
+                self.log("编译完成")
+                self.solidity_code = solidity_code
+                return solidity_code
+            self.log("原生后端不提供Token列表和AST，改用Python流水线")
+        self.log(f"使用Python流水线编译（词法分析器: {_LEXER_BACKEND}）")
         
         # 词法分析
         self.log("开始词法分析...")
         try:
-            self.tokens = tokenize(source_code)
-            self.log(f"词法分析完成，共 {len(self.tokens)} 个Token")
+            tokens = tokenize(source_code)
+            self.log(f"词法分析完成，共 {len(tokens)} 个Token")
         except Exception as e:
             raise LexerError(f"词法分析失败: {e}")
+        if self.keep_intermediates:
+            self.tokens = tokens
         
         # 语法分析
         self.log("开始语法分析...")
         try:
-            self.ast = parse(self.tokens)
+            tree = parse(tokens)
             self.log("语法分析完成")
         except Exception as e:
             raise ParserError(f"语法分析失败: {e}")
+        # 不保留中间结果时，Token列表在代码生成前释放，AST在返回后释放
+        del tokens
+        if self.keep_intermediates:
+            self.ast = tree
         
         # 代码生成
         self.log("开始代码生成...")
         try:
-            self.solidity_code = generate_solidity(self.ast)
+            solidity_code = generate_solidity(tree)
             self.log("代码生成完成")
         except Exception as e:
             raise CodeGenError(f"代码生成失败: {e}")
         
-        return self.solidity_code
+        self.solidity_code = solidity_code
+        return solidity_code
     
     def get_tokens(self):
         """获取Token列表"""
@@ -141,6 +393,21 @@ class ChineseSolidityCompiler:
         return self.solidity_code
 
 
+# 便捷函数在非详细模式下复用的编译器实例，每个线程一个（编译器实例本身不是线程安全的）
+_default_compilers = threading.local()
+
+
+def _get_compiler(verbose: bool) -> ChineseSolidityCompiler:
+    """获取便捷函数使用的编译器"""
+    if verbose:
+        return ChineseSolidityCompiler(verbose=True, keep_intermediates=False)
+    compiler = getattr(_default_compilers, "compiler", None)
+    if compiler is None:
+        compiler = ChineseSolidityCompiler(verbose=False, keep_intermediates=False)
+        _default_compilers.compiler = compiler
+    return compiler
+
+
 def compile_file(input_file: str, output_file: Optional[str] = None, verbose: bool = False) -> str:
     """
     便捷函数：编译中文智能合约文件
@@ -153,7 +420,7 @@ def compile_file(input_file: str, output_file: Optional[str] = None, verbose: bo
     Returns:
         生成的Solidity代码
     """
-    compiler = ChineseSolidityCompiler(verbose=verbose)
+    compiler = _get_compiler(verbose)
     return compiler.compile_file(input_file, output_file)
 
 
@@ -168,7 +435,7 @@ def compile_code(source_code: str, verbose: bool = False) -> str:
     Returns:
         生成的Solidity代码
     """
-    compiler = ChineseSolidityCompiler(verbose=verbose)
+    compiler = _get_compiler(verbose)
     return compiler.compile(source_code)
 
 
@@ -0,0 +1,183 @@
+"""
+中文智能合约编译守护进程
+常驻进程复用已加载的编译器，通过 Unix 套接字为编辑器插件等工具提供编译服务
+
+通信协议（长度前缀）:
+    请求: 4字节大端长度 + UTF-8 源代码
+    响应: 1字节状态（0 成功，1 失败）+ 4字节大端长度 + UTF-8 内容（Solidity代码或错误信息）
+"""
+
+import os
+import socket
+import socketserver
+import struct
+from typing import Optional
+
+# 客户端只需要本模块的协议部分，编译器在创建 CompileServer 时才导入，避免拖慢客户端启动
+_REQUEST_HEADER = struct.Struct(">I")
+_RESPONSE_HEADER = struct.Struct(">BI")
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+# 请求源代码的大小上限，超过时不读取请求体，直接返回错误
+MAX_REQUEST_SIZE = 16 * 1024 * 1024
+
+# 服务端读取一个请求的超时（秒）。服务端依次处理请求，连接后不发送数据的客户端
+# 最多阻塞后续请求这么久
+REQUEST_TIMEOUT = 5.0
+
+# 客户端等待响应的超时（秒），需容纳排在前面的请求和本次编译的耗时
+CLIENT_TIMEOUT = 30.0
+
+# Windows 上的 CPython 没有 Unix 套接字，socketserver 也不提供 UnixStreamServer
+HAS_UNIX_SOCKETS = hasattr(socket, "AF_UNIX")
+
+
+class RemoteCompileError(Exception):
+    """守护进程返回的编译错误"""
+    pass
+
+
+def get_socket_path() -> str:
+    """获取守护进程套接字路径（与 compiler.get_cache_dir 为同一目录）"""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache_home, "zhsc", "zhsc.sock")
+
+
+def _read_exactly(f, size: int) -> bytes:
+    """读取指定长度的数据，连接提前关闭时抛出 ConnectionError"""
+    data = f.read(size)
+    if len(data) != size:
+        raise ConnectionError("连接意外关闭")
+    return data
+
+
+class _CompileHandler(socketserver.StreamRequestHandler):
+    """处理单个编译请求"""
+
+    timeout = REQUEST_TIMEOUT
+
+    def handle(self):
+        try:
+            (size,) = _REQUEST_HEADER.unpack(_read_exactly(self.rfile, _REQUEST_HEADER.size))
+            if size > MAX_REQUEST_SIZE:
+                self._respond(STATUS_ERROR, f"源代码超过 {MAX_REQUEST_SIZE} 字节的大小限制")
+                return
+            source_code = _read_exactly(self.rfile, size).decode("utf-8")
+        except (OSError, UnicodeDecodeError):
+            # 连接中断、读取超时或请求不是合法的UTF-8
+            return
+
+        try:
+            status, payload = STATUS_OK, self.server.compiler.compile(source_code)
+        except Exception as e:
+            status, payload = STATUS_ERROR, str(e)
+        self._respond(status, payload)
+
+    def _respond(self, status: int, payload: str):
+        data = payload.encode("utf-8")
+        try:
+            self.wfile.write(_RESPONSE_HEADER.pack(status, len(data)) + data)
+        except OSError:
+            # 客户端已断开（如等待超时后回退到进程内编译）
+            pass
+
+
+def _is_running(socket_path: str) -> bool:
+    """检查套接字上是否已有守护进程在监听"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+
+if HAS_UNIX_SOCKETS:
+    class CompileServer(socketserver.UnixStreamServer):
+        """
+        编译守护进程服务端
+
+        依次处理请求，所有请求共用一个编译器实例。关闭时删除本实例绑定的套接字文件。
+        """
+
+        # 是否已由本实例绑定套接字。绑定失败时 TCPServer.__init__ 也会调用 server_close，
+        # 此时套接字文件可能属于抢先启动的另一个守护进程，不能删除
+        _bound = False
+
+        def __init__(self, socket_path: Optional[str] = None):
+            """
+            绑定套接字并加载编译器
+
+            Args:
+                socket_path: 套接字路径，默认为 get_socket_path()
+            """
+            from compiler import ChineseSolidityCompiler
+
+            socket_path = socket_path or get_socket_path()
+            if os.path.exists(socket_path):
+                if _is_running(socket_path):
+                    raise RuntimeError(f"守护进程已在运行: {socket_path}")
+                # 上次异常退出遗留的套接字文件
+                os.remove(socket_path)
+            dirname = os.path.dirname(socket_path)
+            if dirname:
+                os.makedirs(dirname, mode=0o700, exist_ok=True)
+
+            self.compiler = ChineseSolidityCompiler(verbose=False, keep_intermediates=False)
+            super().__init__(socket_path, _CompileHandler)
+
+        def server_bind(self):
+            # bind 时套接字文件按 umask 创建，临时收紧 umask，使其从创建起只有所有者可以连接
+            old_umask = os.umask(0o077)
+            try:
+                super().server_bind()
+            finally:
+                os.umask(old_umask)
+            self._bound = True
+
+        def server_close(self):
+            super().server_close()
+            if self._bound:
+                self._bound = False
+                try:
+                    os.remove(self.server_address)
+                except FileNotFoundError:
+                    pass
+
+
+def request_compile(source_code: str, socket_path: Optional[str] = None,
+                    timeout: float = CLIENT_TIMEOUT) -> str:
+    """
+    请求守护进程编译源代码
+
+    Args:
+        source_code: 中文源代码
+        socket_path: 套接字路径，默认为 get_socket_path()
+        timeout: 连接和等待响应的超时（秒），超时时抛出 TimeoutError
+
+    Returns:
+        生成的Solidity代码
+
+    Raises:
+        OSError: 无法连接守护进程或等待超时（包括当前平台不支持 Unix 套接字、
+            源代码超过 MAX_REQUEST_SIZE）
+        RemoteCompileError: 编译失败
+    """
+    if not HAS_UNIX_SOCKETS:
+        raise OSError("当前平台不支持 Unix 套接字")
+    data = source_code.encode("utf-8")
+    if len(data) > MAX_REQUEST_SIZE:
+        raise OSError(f"源代码超过守护进程 {MAX_REQUEST_SIZE} 字节的大小限制")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path or get_socket_path())
+        sock.sendall(_REQUEST_HEADER.pack(len(data)) + data)
+        with sock.makefile("rb") as f:
+            status, size = _RESPONSE_HEADER.unpack(_read_exactly(f, _RESPONSE_HEADER.size))
+            payload = _read_exactly(f, size).decode("utf-8")
+
+    if status != STATUS_OK:
+        raise RemoteCompileError(payload)
+    return payload
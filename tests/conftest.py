@@ -0,0 +1,84 @@
+"""
+测试公共配置
+"""
+
+import importlib
+import os
+import sys
+
+import pytest
+
+# 项目采用平铺布局（compiler.py、ast_nodes.py 等位于仓库根目录）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 编译器测试使用的最小词法/语法/代码生成模块，只用于验证 compiler.py 的流程，
+# 不代表真实的中文语法
+PIPELINE_SOURCES = {
+    "lexer/__init__.py": "",
+    "lexer/chinese_lexer.py": (
+        "class ChineseLexer:\n"
+        "    pass\n"
+        "\n\n"
+        "def tokenize(source_code):\n"
+        "    if '错误' in source_code:\n"
+        "        raise ValueError('无法识别的Token')\n"
+        "    return source_code.split()\n"
+    ),
+    "parser/__init__.py": "",
+    "parser/chinese_parser.py": (
+        "class ChineseParser:\n"
+        "    pass\n"
+        "\n\n"
+        "def parse(tokens):\n"
+        "    return list(tokens)\n"
+    ),
+    "codegen/__init__.py": "",
+    "codegen/solidity_generator.py": (
+        "class SolidityGenerator:\n"
+        "    pass\n"
+        "\n\n"
+        "def generate_solidity(ast):\n"
+        "    return 'contract ' + '_'.join(ast) + ' {}\\n'\n"
+    ),
+}
+
+_RELOADED_MODULES = ("compiler", "daemon", "lexer", "parser", "codegen", "_chinese_lexer", "zhsc_core")
+
+
+def _purge_modules():
+    for name in list(sys.modules):
+        if name.split(".")[0] in _RELOADED_MODULES:
+            del sys.modules[name]
+
+
+@pytest.fixture
+def pipeline_dir(tmp_path, monkeypatch):
+    """写入测试用编译流水线模块并加入 sys.path，缓存目录指向临时目录"""
+    path = tmp_path / "pipeline"
+    for relative_path, source in PIPELINE_SOURCES.items():
+        file_path = path / relative_path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(source, encoding="utf-8")
+    monkeypatch.syspath_prepend(str(path))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    for name in ("ZHSC_NO_CACHE", "ZHSC_BACKEND", "ZHSC_LEXER_BACKEND"):
+        monkeypatch.delenv(name, raising=False)
+    _purge_modules()
+    yield path
+    _purge_modules()
+
+
+@pytest.fixture
+def load_compiler(pipeline_dir):
+    """返回重新导入 compiler 模块的函数（环境变量和流水线模块改动后使用）"""
+    def load():
+        _purge_modules()
+        importlib.invalidate_caches()
+        return importlib.import_module("compiler")
+    return load
+
+
+@pytest.fixture
+def compiler_module(load_compiler):
+    """使用测试流水线导入的 compiler 模块"""
+    return load_compiler()
@@ -0,0 +1,238 @@
+"""
+AST节点定义测试
+"""
+
+import inspect
+import re
+
+import pytest
+
+import ast_nodes as a
+from ast_nodes import Mutability, Visibility
+
+
+# 生成 __init__ 之前各节点类手写构造函数的签名
+EXPECTED_SIGNATURES = {
+    a.Program: "(self, contracts=None, line=0, column=0)",
+    a.Contract: "(self, name='', state_variables=None, functions=None, events=None, constructor=None, line=0, column=0)",
+    a.StateVariable: "(self, name='', var_type='', visibility=<Visibility.PRIVATE: 'private'>, initial_value=None, line=0, column=0)",
+    a.Function: "(self, name='', parameters=None, return_type=None, visibility=<Visibility.PUBLIC: 'public'>, mutability=<Mutability.NONE: 'none'>, body=None, line=0, column=0)",
+    a.Constructor: "(self, parameters=None, body=None, line=0, column=0)",
+    a.Event: "(self, name='', parameters=None, line=0, column=0)",
+    a.Parameter: "(self, name='', param_type='', line=0, column=0)",
+    a.Block: "(self, statements=None, line=0, column=0)",
+    a.ReturnStatement: "(self, value=None, line=0, column=0)",
+    a.IfStatement: "(self, condition=None, then_block=None, else_block=None, line=0, column=0)",
+    a.ForStatement: "(self, init=None, condition=None, update=None, body=None, line=0, column=0)",
+    a.WhileStatement: "(self, condition=None, body=None, line=0, column=0)",
+    a.ExpressionStatement: "(self, expression=None, line=0, column=0)",
+    a.VariableDeclaration: "(self, name='', var_type='', initial_value=None, line=0, column=0)",
+    a.Assignment: "(self, left=None, operator='=', right=None, line=0, column=0)",
+    a.BinaryExpression: "(self, left=None, operator='', right=None, line=0, column=0)",
+    a.UnaryExpression: "(self, operator='', operand=None, prefix=True, line=0, column=0)",
+    a.CallExpression: "(self, callee=None, arguments=None, line=0, column=0)",
+    a.MemberExpression: "(self, object=None, property='', line=0, column=0)",
+    a.IndexExpression: "(self, object=None, index=None, line=0, column=0)",
+    a.Identifier: "(self, name='', line=0, column=0)",
+    a.Literal: "(self, value=None, literal_type='', line=0, column=0)",
+}
+
+
+@pytest.mark.parametrize("cls", list(EXPECTED_SIGNATURES), ids=lambda cls: cls.__name__)
+def test_init_signature_matches_handwritten(cls):
+    assert str(inspect.signature(cls.__init__)) == EXPECTED_SIGNATURES[cls]
+
+
+def test_init_defaults():
+    var = a.StateVariable()
+    assert (var.name, var.var_type, var.visibility, var.initial_value) == ("", "", Visibility.PRIVATE, None)
+    func = a.Function()
+    assert func.return_type is None
+    assert func.visibility is Visibility.PUBLIC
+    assert func.mutability is Mutability.NONE
+    assert a.Assignment().operator == "="
+    assert a.UnaryExpression().prefix is True
+    assert (a.Literal().line, a.Literal().column) == (0, 0)
+
+
+def test_init_positional_and_keyword_arguments():
+    body = a.Block()
+    func = a.Function("转账", [a.Parameter("金额", "整数")], "布尔", Visibility.PRIVATE,
+                      Mutability.VIEW, body, 3, 5)
+    assert func.name == "转账"
+    assert func.parameters[0].param_type == "整数"
+    assert func.return_type == "布尔"
+    assert func.visibility is Visibility.PRIVATE
+    assert func.mutability is Mutability.VIEW
+    assert func.body is body
+    assert (func.line, func.column) == (3, 5)
+
+    parameters = []
+    event = a.Event(name="转账事件", parameters=parameters, line=7)
+    assert event.parameters is parameters
+    assert event.line == 7
+
+
+def test_nodes_have_no_instance_dict():
+    node = a.Identifier("余额")
+    assert not hasattr(node, "__dict__")
+    with pytest.raises(AttributeError):
+        node.unknown = 1
+
+
+def test_node_type_is_class_attribute():
+    assert a.Contract.node_type == a.CONTRACT
+    assert a.Contract().node_type == a.CONTRACT
+    assert a.Literal().node_type == a.LITERAL
+
+
+def test_iter_child_nodes_follows_declaration_order():
+    state_variable = a.StateVariable("总供应量")
+    function = a.Function("转账")
+    event = a.Event("转账事件")
+    constructor = a.Constructor()
+    contract = a.Contract("代币", [state_variable], [function], [event], constructor)
+    assert list(contract.iter_child_nodes()) == [state_variable, function, event, constructor]
+
+    condition = a.Identifier("条件")
+    then_block = a.Block()
+    else_block = a.Block()
+    if_statement = a.IfStatement(condition, then_block, else_block)
+    assert list(if_statement.iter_child_nodes()) == [condition, then_block, else_block]
+
+    init, update, body = a.ExpressionStatement(), a.Identifier("i"), a.Block()
+    for_statement = a.ForStatement(init=init, update=update, body=body)
+    assert list(for_statement.iter_child_nodes()) == [init, update, body]
+
+    callee, first, second = a.Identifier("要求"), a.Literal(True), a.Literal("余额不足")
+    call = a.CallExpression(callee, [first, second])
+    assert list(call.iter_child_nodes()) == [callee, first, second]
+
+
+@pytest.mark.parametrize("cls", list(EXPECTED_SIGNATURES), ids=lambda cls: cls.__name__)
+def test_child_fields_follow_declaration(cls):
+    expected = tuple((name, kind is a.NODE_LIST) for name, kind, *_ in cls._fields if kind is not a.SCALAR)
+    assert cls._child_fields == expected
+    assert cls._reversed_child_fields == expected[::-1]
+
+
+def test_iter_child_nodes_skips_scalars_and_missing_children():
+    assert list(a.Identifier("x").iter_child_nodes()) == []
+    assert list(a.Literal(a.Identifier("x")).iter_child_nodes()) == []
+    assert list(a.ReturnStatement().iter_child_nodes()) == []
+    member = a.MemberExpression(a.Identifier("消息"), "发送者")
+    assert [child.name for child in member.iter_child_nodes()] == ["消息"]
+
+
+def test_empty_list_fields_share_default():
+    first, second = a.Block(), a.Block()
+    assert first.statements is second.statements
+    assert not first.statements
+    assert list(first.iter_child_nodes()) == []
+
+
+def test_ensure_list_allows_append():
+    block = a.Block()
+    other = a.Block()
+    statement = a.ReturnStatement()
+    statements = block.ensure_list("statements")
+    statements.append(statement)
+    assert block.ensure_list("statements") is statements
+    assert block.statements == [statement]
+    assert list(block.iter_child_nodes()) == [statement]
+    assert not other.statements
+
+
+def test_ensure_list_keeps_passed_list():
+    arguments = [a.Identifier("x")]
+    call = a.CallExpression(a.Identifier("f"), arguments)
+    assert call.ensure_list("arguments") is arguments
+
+
+def test_repr_shows_empty_list_fields_as_lists():
+    assert repr(a.Block()) == "Block(statements=[])"
+    assert repr(a.Program([a.Contract("甲")])) == (
+        "Program(contracts=[Contract(name='甲', state_variables=[], functions=[], "
+        "events=[], constructor=None)])")
+
+
+def _recursive_descendants(node):
+    yield node
+    for child in node.iter_child_nodes():
+        yield from _recursive_descendants(child)
+
+
+def test_iter_descendants_matches_recursive_preorder():
+    x, y = a.Identifier("x"), a.Identifier("y")
+    expression = a.BinaryExpression(x, "+", y)
+    body = a.Block([a.ExpressionStatement(expression), a.ReturnStatement(a.Literal(1))])
+    function = a.Function("f", [a.Parameter("p", "整数")], body=body)
+    if_statement = a.IfStatement(a.Identifier("c"), a.Block(), None)
+    contract = a.Contract("甲", [a.StateVariable("v")], [function, a.Function("g", body=a.Block([if_statement]))],
+                          [a.Event("e")], a.Constructor())
+    program = a.Program([contract, a.Contract("乙")])
+
+    assert list(a.iter_descendants(program)) == list(_recursive_descendants(program))
+
+
+def test_iter_descendants_handles_deep_trees():
+    node = a.Identifier("x")
+    for _ in range(10000):
+        node = a.UnaryExpression("-", node)
+    assert sum(1 for _ in a.iter_descendants(node)) == 10001
+
+
+class _NameCollector(a.NodeVisitor):
+    """记录访问到的标识符和函数，函数只记录名称不深入函数体"""
+
+    def __init__(self):
+        self.visited = []
+
+    def visit_Identifier(self, node):
+        self.visited.append(("Identifier", node.name))
+
+    def visit_Function(self, node):
+        self.visited.append(("Function", node.name))
+
+
+def test_node_visitor_dispatch():
+    function = a.Function("f", body=a.Block([a.ExpressionStatement(a.Identifier("函数体内"))]))
+    expression = a.BinaryExpression(a.Identifier("y"), "+", a.Identifier("z"))
+    constructor = a.Constructor(body=a.Block([a.ExpressionStatement(expression)]))
+    state_variable = a.StateVariable("v", initial_value=a.Identifier("x"))
+    contract = a.Contract("甲", [state_variable], [function], constructor=constructor)
+    collector = _NameCollector()
+    collector.visit(a.Program([contract]))
+    # 未定义 visit_ 方法的节点（Program、Contract、Block 等）经 generic_visit 访问子节点
+    assert collector.visited == [("Identifier", "x"), ("Function", "f"), ("Identifier", "y"), ("Identifier", "z")]
+
+
+def test_node_visitor_returns_visit_result():
+    class Evaluator(a.NodeVisitor):
+        def visit_Literal(self, node):
+            return node.value
+
+        def visit_BinaryExpression(self, node):
+            return self.visit(node.left) + self.visit(node.right)
+
+    expression = a.BinaryExpression(a.Literal(1), "+", a.BinaryExpression(a.Literal(2), "+", a.Literal(3)))
+    assert Evaluator().visit(expression) == 6
+    assert a.NodeVisitor().visit(expression) is None
+
+
+def _concrete_node_classes():
+    classes, pending = [], [a.ASTNode]
+    while pending:
+        cls = pending.pop()
+        pending.extend(cls.__subclasses__())
+        if "_fields" in cls.__dict__:
+            classes.append(cls)
+    return classes
+
+
+def test_node_type_names_match_classes():
+    classes = _concrete_node_classes()
+    assert sorted(cls.node_type for cls in classes) == list(range(len(a._NODE_TYPE_NAMES)))
+    for cls in classes:
+        snake_case = re.sub(r"(?<!^)(?=[A-Z])", "_", cls.__name__).lower()
+        assert a.node_type_name(cls.node_type) == snake_case
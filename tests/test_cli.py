@@ -0,0 +1,59 @@
+"""
+命令行工具测试
+"""
+
+import importlib
+
+import pytest
+
+
+@pytest.fixture
+def cli_module(compiler_module, monkeypatch):
+    """导入 cli 模块，rich 控制台按足够宽的终端重新创建，避免输出被折行"""
+    pytest.importorskip("click.testing")
+    pytest.importorskip("rich")
+    cli = importlib.import_module("cli")
+    monkeypatch.setenv("COLUMNS", "1000")
+    cli._console.cache_clear()
+    yield cli
+    cli._console.cache_clear()
+
+
+def _invoke(cli, *args):
+    from click.testing import CliRunner
+    return CliRunner().invoke(cli.cli, list(args))
+
+
+def test_compile_all(cli_module, tmp_path):
+    (tmp_path / "a.zhs").write_text("合约 甲", encoding="utf-8")
+    (tmp_path / "sub" / "deep").mkdir(parents=True)
+    (tmp_path / "sub" / "b.zhs").write_text("合约 乙", encoding="utf-8")
+    (tmp_path / "sub" / "deep" / "c.zhs").write_text("合约 丙", encoding="utf-8")
+    (tmp_path / "sub" / "bad.zhs").write_text("错误", encoding="utf-8")
+    (tmp_path / "notes.txt").write_text("合约 丁", encoding="utf-8")
+
+    result = _invoke(cli_module, "compile-all", str(tmp_path), "-j", "2")
+
+    assert result.exit_code == 1
+    assert (tmp_path / "a.sol").read_text(encoding="utf-8") == "contract 合约_甲 {}\n"
+    assert (tmp_path / "sub" / "b.sol").read_text(encoding="utf-8") == "contract 合约_乙 {}\n"
+    assert (tmp_path / "sub" / "deep" / "c.sol").read_text(encoding="utf-8") == "contract 合约_丙 {}\n"
+    assert not (tmp_path / "sub" / "bad.sol").exists()
+    assert not (tmp_path / "notes.sol").exists()
+    assert f"✗ {tmp_path / 'sub' / 'bad.zhs'}: " in result.output
+    assert "无法识别的Token" in result.output
+    assert "1/4 个文件编译失败" in result.output
+
+
+def test_compile_all_success(cli_module, tmp_path):
+    (tmp_path / "a.zhs").write_text("合约 甲", encoding="utf-8")
+    result = _invoke(cli_module, "compile-all", str(tmp_path), "-j", "1")
+    assert result.exit_code == 0
+    assert "全部编译成功" in result.output
+    assert (tmp_path / "a.sol").read_text(encoding="utf-8") == "contract 合约_甲 {}\n"
+
+
+def test_compile_all_without_sources(cli_module, tmp_path):
+    result = _invoke(cli_module, "compile-all", str(tmp_path))
+    assert result.exit_code == 0
+    assert "未找到 .zhs 文件" in result.output
@@ -0,0 +1,313 @@
+"""
+编译器主程序测试
+"""
+
+import os
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+def test_compile_code(compiler_module):
+    assert compiler_module.compile_code("合约 甲") == "contract 合约_甲 {}\n"
+
+
+def test_compile_errors_are_wrapped(compiler_module):
+    with pytest.raises(compiler_module.LexerError):
+        compiler_module.compile_code("错误")
+
+
+def test_keep_intermediates(compiler_module):
+    compiler = compiler_module.ChineseSolidityCompiler()
+    compiler.compile("合约 甲")
+    assert compiler.get_tokens() == ["合约", "甲"]
+    assert compiler.get_ast() == ["合约", "甲"]
+
+    compiler = compiler_module.ChineseSolidityCompiler(keep_intermediates=False)
+    compiler.compile("合约 甲")
+    assert compiler.get_tokens() == []
+    assert compiler.get_ast() is None
+
+
+def test_c_lexer_backend_missing_warns(load_compiler, monkeypatch):
+    monkeypatch.setenv("ZHSC_LEXER_BACKEND", "c")
+    with pytest.warns(RuntimeWarning, match="_chinese_lexer"):
+        compiler_module = load_compiler()
+    assert compiler_module.compile_code("合约 甲") == "contract 合约_甲 {}\n"
+
+
+def test_c_lexer_backend(load_compiler, pipeline_dir, monkeypatch):
+    (pipeline_dir / "_chinese_lexer.py").write_text(
+        "def tokenize_bytes(buf):\n"
+        "    return [token.upper() for token in buf.decode('utf-8').split()]\n",
+        encoding="utf-8")
+    monkeypatch.setenv("ZHSC_LEXER_BACKEND", "c")
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        compiler_module = load_compiler()
+    assert compiler_module.compile_code("a b") == "contract A_B {}\n"
+
+
+ZHSC_CORE_SOURCE = (
+    "def compile_to_solidity(source_code):\n"
+    "    return 'native ' + source_code\n"
+)
+
+
+def test_native_backend_requires_opt_in(load_compiler, pipeline_dir):
+    (pipeline_dir / "zhsc_core.py").write_text(ZHSC_CORE_SOURCE, encoding="utf-8")
+    compiler_module = load_compiler()
+    assert compiler_module.zhsc_core is None
+    assert compiler_module.compile_code("合约 甲") == "contract 合约_甲 {}\n"
+
+
+def test_native_backend(load_compiler, pipeline_dir, monkeypatch, capsys):
+    (pipeline_dir / "zhsc_core.py").write_text(ZHSC_CORE_SOURCE, encoding="utf-8")
+    monkeypatch.setenv("ZHSC_BACKEND", "native")
+    compiler_module = load_compiler()
+    assert compiler_module.compile_code("合约 甲", verbose=True) == "native 合约 甲"
+    assert "zhsc_core" in capsys.readouterr().out
+
+    # 需要中间结果时仍使用Python流水线
+    compiler = compiler_module.ChineseSolidityCompiler(verbose=True)
+    assert compiler.compile("合约 甲") == "contract 合约_甲 {}\n"
+    assert "改用Python流水线" in capsys.readouterr().out
+
+
+def test_native_backend_missing_warns(load_compiler, monkeypatch):
+    monkeypatch.setenv("ZHSC_BACKEND", "native")
+    with pytest.warns(RuntimeWarning, match="zhsc_core"):
+        compiler_module = load_compiler()
+    assert compiler_module.compile_code("合约 甲") == "contract 合约_甲 {}\n"
+
+
+def test_read_large_source_matches_text_mode(compiler_module, tmp_path):
+    line = "合约 甲 {}"
+    data = "\r\n".join([line] * 5000) + "\r" + line + "\r\r\n\n"
+    path = tmp_path / "large.zhs"
+    path.write_bytes(data.encode("utf-8"))
+    assert path.stat().st_size >= compiler_module._MMAP_THRESHOLD
+
+    with open(path, encoding="utf-8") as f:
+        expected = f.read()
+    assert compiler_module._read_source(str(path)) == expected
+    assert "\r" not in expected
+
+    compiler = compiler_module.ChineseSolidityCompiler()
+    compiler.compile_file(str(path))
+    assert compiler.source_code == expected
+
+
+@pytest.mark.parametrize("size", [16, 128 * 1024], ids=["small", "large"])
+def test_compile_file_wraps_invalid_utf8(compiler_module, tmp_path, size):
+    path = tmp_path / "bad.zhs"
+    path.write_bytes(b"a" * size + b"\xff")
+    with pytest.raises(compiler_module.CompilerError, match="读取文件失败"):
+        compiler_module.compile_file(str(path))
+
+
+def test_compile_file_output_without_directory(compiler_module, tmp_path, monkeypatch):
+    (tmp_path / "a.zhs").write_text("合约 甲", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    compiler_module.compile_file("a.zhs", "a.sol")
+    assert (tmp_path / "a.sol").read_text(encoding="utf-8") == "contract 合约_甲 {}\n"
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_compile_file_creates_output_directory(compiler_module, tmp_path):
+    (tmp_path / "a.zhs").write_text("合约 甲", encoding="utf-8")
+    output = tmp_path / "build" / "sol" / "a.sol"
+    compiler_module.compile_file(str(tmp_path / "a.zhs"), str(output))
+    assert output.read_text(encoding="utf-8") == "contract 合约_甲 {}\n"
+
+
+def test_compile_file_keeps_output_mode(compiler_module, tmp_path):
+    (tmp_path / "a.zhs").write_text("合约 甲", encoding="utf-8")
+    output = tmp_path / "a.sol"
+    output.write_text("旧内容", encoding="utf-8")
+    output.chmod(0o640)
+    compiler_module.compile_file(str(tmp_path / "a.zhs"), str(output))
+    assert output.read_text(encoding="utf-8") == "contract 合约_甲 {}\n"
+    assert output.stat().st_mode & 0o777 == 0o640
+
+
+def test_compile_file_new_output_follows_umask(compiler_module, tmp_path):
+    (tmp_path / "a.zhs").write_text("合约 甲", encoding="utf-8")
+    output = tmp_path / "a.sol"
+    compiler_module.compile_file(str(tmp_path / "a.zhs"), str(output))
+    assert output.stat().st_mode & 0o777 == 0o666 & ~compiler_module._UMASK
+
+
+def test_concurrent_writes_to_same_output(compiler_module, tmp_path):
+    output = tmp_path / "a.sol"
+
+    def write(n):
+        compiler_module._write_bytes_atomic(str(output), f"第{n}次".encode("utf-8"))
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(write, range(120)))
+    assert output.read_text(encoding="utf-8").startswith("第")
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_compile_file_writes_through_symlink(compiler_module, tmp_path):
+    (tmp_path / "a.zhs").write_text("合约 甲", encoding="utf-8")
+    target = tmp_path / "target.sol"
+    target.write_text("旧内容", encoding="utf-8")
+    link = tmp_path / "link.sol"
+    link.symlink_to(target)
+    compiler_module.compile_file(str(tmp_path / "a.zhs"), str(link))
+    assert link.is_symlink()
+    assert target.read_text(encoding="utf-8") == "contract 合约_甲 {}\n"
+
+
+@pytest.fixture
+def codegen_calls(compiler_module, monkeypatch):
+    """记录代码生成的调用次数，用于判断是否命中编译缓存"""
+    calls = []
+    generate = compiler_module.generate_solidity
+
+    def counting_generate(ast):
+        calls.append(ast)
+        return generate(ast)
+
+    monkeypatch.setattr(compiler_module, "generate_solidity", counting_generate)
+    return calls
+
+
+def _cache_entries(tmp_path):
+    cache_dir = tmp_path / "cache" / "zhsc"
+    return sorted(cache_dir.glob("*.sol")) if cache_dir.exists() else []
+
+
+def test_cache_miss_then_hit(compiler_module, codegen_calls, tmp_path):
+    source = tmp_path / "a.zhs"
+    source.write_text("合约 甲", encoding="utf-8")
+
+    assert compiler_module.compile_file(str(source)) == "contract 合约_甲 {}\n"
+    assert len(codegen_calls) == 1
+    assert len(_cache_entries(tmp_path)) == 1
+
+    assert compiler_module.compile_file(str(source), str(tmp_path / "a.sol")) == "contract 合约_甲 {}\n"
+    assert len(codegen_calls) == 1
+    assert (tmp_path / "a.sol").read_text(encoding="utf-8") == "contract 合约_甲 {}\n"
+
+    source.write_text("合约 乙", encoding="utf-8")
+    assert compiler_module.compile_file(str(source)) == "contract 合约_乙 {}\n"
+    assert len(codegen_calls) == 2
+    assert len(_cache_entries(tmp_path)) == 2
+
+
+def test_cache_skipped_when_keeping_intermediates(compiler_module, codegen_calls, tmp_path):
+    source = tmp_path / "a.zhs"
+    source.write_text("合约 甲", encoding="utf-8")
+    compiler_module.compile_file(str(source))
+
+    compiler = compiler_module.ChineseSolidityCompiler()
+    compiler.compile_file(str(source))
+    assert len(codegen_calls) == 2
+    assert compiler.get_tokens() == ["合约", "甲"]
+
+
+def test_cache_disabled_by_env(compiler_module, codegen_calls, tmp_path, monkeypatch):
+    monkeypatch.setenv("ZHSC_NO_CACHE", "1")
+    source = tmp_path / "a.zhs"
+    source.write_text("合约 甲", encoding="utf-8")
+    compiler_module.compile_file(str(source))
+    compiler_module.compile_file(str(source))
+    assert len(codegen_calls) == 2
+    assert _cache_entries(tmp_path) == []
+
+
+def test_cache_invalidated_by_codegen_change(load_compiler, pipeline_dir, tmp_path):
+    source = tmp_path / "a.zhs"
+    source.write_text("合约 甲", encoding="utf-8")
+    assert load_compiler().compile_file(str(source)) == "contract 合约_甲 {}\n"
+
+    generator = pipeline_dir / "codegen" / "solidity_generator.py"
+    generator.write_text(
+        generator.read_text(encoding="utf-8").replace("'contract '", "'contract  '"),
+        encoding="utf-8")
+    assert load_compiler().compile_file(str(source)) == "contract  合约_甲 {}\n"
+
+
+def test_cache_key_includes_version_and_backend(compiler_module, monkeypatch):
+    path = compiler_module._cache_path("合约 甲")
+    assert compiler_module._cache_path("合约 甲") == path
+
+    monkeypatch.setattr(compiler_module, "__version__", "9.9.9")
+    assert compiler_module._cache_path("合约 甲") != path
+    monkeypatch.undo()
+
+    monkeypatch.setattr(compiler_module, "_LEXER_BACKEND", "c")
+    assert compiler_module._cache_path("合约 甲") != path
+
+
+def test_cache_evicts_least_recently_used(compiler_module, tmp_path, monkeypatch):
+    monkeypatch.setattr(compiler_module, "_CACHE_MAX_ENTRIES", 2)
+    source = tmp_path / "a.zhs"
+    for i, name in enumerate(["甲", "乙", "丙"]):
+        source.write_text(f"合约 {name}", encoding="utf-8")
+        compiler_module.compile_file(str(source))
+        entries = _cache_entries(tmp_path)
+        # 固定修改时间，避免依赖文件系统的时间精度
+        for entry in entries:
+            if entry.name == os.path.basename(compiler_module._cache_path(f"合约 {name}")):
+                os.utime(entry, ns=(i * 10**9, i * 10**9))
+
+    names = {entry.name for entry in _cache_entries(tmp_path)}
+    assert len(names) == 2
+    assert os.path.basename(compiler_module._cache_path("合约 甲")) not in names
+
+
+def test_corrupt_cache_entry_is_a_miss(compiler_module, codegen_calls, tmp_path):
+    source = tmp_path / "a.zhs"
+    source.write_text("合约 甲", encoding="utf-8")
+    cache_path = compiler_module._cache_path("合约 甲")
+    os.makedirs(os.path.dirname(cache_path))
+    with open(cache_path, "wb") as f:
+        f.write(b"\xff\xfe")
+
+    assert compiler_module.compile_file(str(source)) == "contract 合约_甲 {}\n"
+    assert len(codegen_calls) == 1
+    with open(cache_path, encoding="utf-8") as f:
+        assert f.read() == "contract 合约_甲 {}\n"
+
+
+def test_cache_prunes_stale_temp_files(compiler_module, tmp_path):
+    cache_dir = tmp_path / "cache" / "zhsc"
+    cache_dir.mkdir(parents=True)
+    stale, fresh = cache_dir / "stale.tmp", cache_dir / "fresh.tmp"
+    stale.write_bytes(b"")
+    fresh.write_bytes(b"")
+    os.utime(stale, (0, 0))
+
+    source = tmp_path / "a.zhs"
+    source.write_text("合约 甲", encoding="utf-8")
+    compiler_module.compile_file(str(source))
+    assert not stale.exists()
+    assert fresh.exists()
+
+
+def test_compile_code_is_thread_safe(compiler_module, monkeypatch):
+    original_log = compiler_module.ChineseSolidityCompiler.log
+
+    def slow_log(self, message):
+        # 拉长编译过程，让多个线程的编译交错执行
+        time.sleep(0.001)
+        original_log(self, message)
+
+    monkeypatch.setattr(compiler_module.ChineseSolidityCompiler, "log", slow_log)
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        results = list(executor.map(compiler_module.compile_code, [f"合约 C{n}" for n in range(20)]))
+    assert results == [f"contract 合约_C{n} {{}}\n" for n in range(20)]
+
+
+def test_compile_returns_its_own_result(compiler_module):
+    compiler = compiler_module.ChineseSolidityCompiler(keep_intermediates=False)
+    first = compiler.compile("合约 甲")
+    compiler.solidity_code = "被修改"
+    assert first == "contract 合约_甲 {}\n"
+    assert compiler.compile("合约 乙") == compiler.get_solidity_code() == "contract 合约_乙 {}\n"
@@ -0,0 +1,166 @@
+"""
+编译守护进程测试
+"""
+
+import importlib
+import os
+import socket
+import stat
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def daemon_module(compiler_module):
+    """使用测试流水线导入的 daemon 模块"""
+    return importlib.import_module("daemon")
+
+
+@pytest.fixture
+def server(daemon_module, tmp_path):
+    """在后台线程中运行的守护进程服务端"""
+    if not daemon_module.HAS_UNIX_SOCKETS:
+        pytest.skip("当前平台不支持 Unix 套接字")
+    server = daemon_module.CompileServer(str(tmp_path / "run" / "zhsc.sock"))
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+
+def test_round_trip(daemon_module, server):
+    assert daemon_module.request_compile("合约 甲", server.server_address) == "contract 合约_甲 {}\n"
+
+
+def test_remote_compile_error(daemon_module, server):
+    with pytest.raises(daemon_module.RemoteCompileError, match="无法识别的Token"):
+        daemon_module.request_compile("错误", server.server_address)
+
+
+def test_idle_connection_does_not_block_later_requests(daemon_module, server, monkeypatch):
+    monkeypatch.setattr(daemon_module._CompileHandler, "timeout", 0.2)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as idle:
+        idle.connect(server.server_address)
+        assert daemon_module.request_compile("合约 甲", server.server_address, timeout=5) == "contract 合约_甲 {}\n"
+
+
+def test_request_times_out(daemon_module, server, monkeypatch):
+    monkeypatch.setattr(daemon_module._CompileHandler, "timeout", 0.5)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as idle:
+        idle.connect(server.server_address)
+        with pytest.raises(TimeoutError):
+            daemon_module.request_compile("合约 甲", server.server_address, timeout=0.1)
+
+
+def test_oversized_request_rejected(daemon_module, server):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(5)
+        sock.connect(server.server_address)
+        sock.sendall(daemon_module._REQUEST_HEADER.pack(daemon_module.MAX_REQUEST_SIZE + 1))
+        with sock.makefile("rb") as f:
+            status, size = daemon_module._RESPONSE_HEADER.unpack(f.read(daemon_module._RESPONSE_HEADER.size))
+            assert status == daemon_module.STATUS_ERROR
+            assert "大小限制" in f.read(size).decode("utf-8")
+
+
+def test_oversized_source_not_sent(daemon_module, server, monkeypatch):
+    monkeypatch.setattr(daemon_module, "MAX_REQUEST_SIZE", 4)
+    with pytest.raises(OSError, match="大小限制"):
+        daemon_module.request_compile("合约 甲", server.server_address)
+
+
+def test_socket_permissions(server):
+    assert stat.S_IMODE(os.stat(server.server_address).st_mode) & 0o077 == 0
+    assert stat.S_IMODE(os.stat(os.path.dirname(server.server_address)).st_mode) == 0o700
+
+
+def test_second_server_refused(daemon_module, server):
+    with pytest.raises(RuntimeError):
+        daemon_module.CompileServer(server.server_address)
+
+
+def test_losing_start_race_keeps_winner_socket(daemon_module, server, monkeypatch):
+    # 模拟两个守护进程同时启动：检查时套接字文件还不存在，绑定时已被另一方抢先
+    exists = os.path.exists
+    checked = []
+
+    def exists_once_false(path):
+        if path == server.server_address and not checked:
+            checked.append(path)
+            return False
+        return exists(path)
+
+    monkeypatch.setattr(daemon_module.os.path, "exists", exists_once_false)
+    with pytest.raises(OSError):
+        daemon_module.CompileServer(server.server_address)
+    monkeypatch.undo()
+
+    assert os.path.exists(server.server_address)
+    assert daemon_module.request_compile("合约 甲", server.server_address) == "contract 合约_甲 {}\n"
+
+
+def test_server_close_removes_socket(daemon_module, tmp_path):
+    if not daemon_module.HAS_UNIX_SOCKETS:
+        pytest.skip("当前平台不支持 Unix 套接字")
+    socket_path = str(tmp_path / "zhsc.sock")
+    daemon_module.CompileServer(socket_path).server_close()
+    assert not os.path.exists(socket_path)
+
+
+def test_request_without_daemon(daemon_module, tmp_path):
+    with pytest.raises(OSError):
+        daemon_module.request_compile("合约 甲", str(tmp_path / "missing.sock"))
+
+
+def test_request_without_unix_sockets(daemon_module, monkeypatch):
+    monkeypatch.setattr(daemon_module, "HAS_UNIX_SOCKETS", False)
+    with pytest.raises(OSError):
+        daemon_module.request_compile("合约 甲")
+
+
+@pytest.fixture
+def run_client(daemon_module, tmp_path):
+    """通过 click 调用 zhsc client 命令"""
+    testing = pytest.importorskip("click.testing")
+    cli = importlib.import_module("cli")
+    source_file = tmp_path / "合约.zhs"
+    source_file.write_text("合约 甲", encoding="utf-8")
+
+    def run(*args):
+        return testing.CliRunner().invoke(cli.cli, ["client", str(source_file), *args])
+    return run
+
+
+def test_client_uses_daemon(run_client, server, daemon_module, monkeypatch):
+    calls = []
+    compile_code = server.compiler.compile
+    monkeypatch.setattr(server.compiler, "compile", lambda source: calls.append(source) or compile_code(source))
+    result = run_client("--socket", server.server_address)
+    assert result.exit_code == 0
+    assert result.output == "contract 合约_甲 {}\n"
+    assert calls == ["合约 甲"]
+
+
+def test_client_falls_back_without_daemon(run_client, tmp_path):
+    result = run_client("--socket", str(tmp_path / "missing.sock"))
+    assert result.exit_code == 0
+    assert result.output == "contract 合约_甲 {}\n"
+
+
+def test_client_falls_back_without_unix_sockets(run_client, daemon_module, monkeypatch):
+    monkeypatch.setattr(daemon_module, "HAS_UNIX_SOCKETS", False)
+    result = run_client()
+    assert result.exit_code == 0
+    assert result.output == "contract 合约_甲 {}\n"
+
+
+def test_daemon_command_reports_running_daemon(daemon_module, server):
+    testing = pytest.importorskip("click.testing")
+    pytest.importorskip("rich")
+    cli = importlib.import_module("cli")
+    result = testing.CliRunner().invoke(cli.cli, ["daemon", "--socket", server.server_address])
+    assert result.exit_code == 1
+    assert "守护进程已在运行" in result.output